@@ -1,4 +1,6 @@
-from typing import Any, Dict, Optional, Union
+import sys
+from typing import Any, Dict, List, Optional, Union
+
 from utils import *
 
 
@@ -9,6 +11,8 @@ class ScanResults:
     'function_start_line', 'if_statements', 'loop_statements', etc.
     """
 
+    __slots__ = ("scan_data", "_index")
+
     def __init__(self, json_path: str):
         """
         :param json_path: path to the JSON file with scan results
@@ -26,6 +30,55 @@ class ScanResults:
         #   ...
         # }
 
+        # Precompute an index mapping
+        # (problem, solution, function_name, start_line, end_line) -> entry_id
+        # so find_fun_scan_results is a single dict lookup instead of a
+        # linear scan over scan_data for every label.
+        self._index: Dict[Tuple, str] = {}
+        # Bind globals to locals so the per-entry loop below pays LOAD_FAST
+        # instead of repeated global/attribute lookups.
+        _parse = parse_filename
+        _add = self._index.setdefault
+        # Intern the key strings so probes against the index compare by
+        # pointer identity instead of character-by-character.
+        _intern = sys.intern
+        for entry_id, entry_val in self.scan_data.items():
+            entry_get = entry_val.get
+            entry_func_name = entry_get("function_name", None)
+            entry_start_line = entry_get("function_start_line", None)
+            entry_end_line = entry_get("function_end_line", None)
+            entry_filepath = entry_get("filepath", None)
+
+            if not entry_filepath or not entry_func_name or not entry_start_line:
+                continue  # missing data, skip
+
+            (
+                entry_filename,
+                entry_dataset,
+                entry_problem,
+                entry_solution,
+                entry_parsed_func,
+                entry_parsed_start,
+                entry_parsed_end,
+            ) = _parse(entry_filepath)
+
+            if not entry_filename:
+                # parse_filename failed on the entry's filepath
+                continue
+
+            # setdefault keeps the first matching entry, mirroring the order
+            # the old linear scan would have returned them in.
+            _add(
+                (
+                    _intern(entry_problem),
+                    _intern(entry_solution),
+                    _intern(entry_func_name),
+                    entry_start_line,
+                    entry_end_line,
+                ),
+                entry_id,
+            )
+
     def get(self, entry_id: str) -> Union[None, Dict]:
         return self.scan_data.get(entry_id, None)
 
@@ -34,11 +87,8 @@ class ScanResults:
         Given a file path like '/path/to/p03366_s021784433_stripped_process_case_14_86.yaml',
         we parse out (filename, problem, solution, function, start_line, end_line) using `parse_filename`.
 
-        Then for each entry in self.scan_data:
-          1) We also parse the entry's 'filepath' via parse_filename.
-          2) Compare problem + solution from both sides.
-          3) Compare function_name with the label's function.
-          4) Compare function_start_line with the label's start_line.
+        We then look up (problem, solution, function, start_line, end_line)
+        in the index built at construction time.
 
         If matched, return the entry ID (like "95"). Otherwise, return None.
         """
@@ -60,62 +110,70 @@ class ScanResults:
             # parse_filename failed on label_filepath
             return None
 
-        # Now loop over each entry in our JSON data
-        for entry_id, entry_val in self.scan_data.items():
-            # Extract the function name / start line from the JSON
-            entry_func_name = entry_val.get("function_name", None)
-            entry_start_line = entry_val.get("function_start_line", None)
-            entry_end_line = entry_val.get("function_end_line", None)
-            entry_filepath = entry_val.get("filepath", None)
-
-            if not entry_filepath or not entry_func_name or not entry_start_line:
-                continue  # missing data, skip
-
-            # Parse the scan result's 'filepath' to get problem/solution info
-            entry_file_parts = parse_filename(entry_filepath)
-            # e.g. (entry_filename, entry_problem, entry_solution, entry_function, entry_start, entry_end)
+        # O(1) hash probe against the index built in __init__. Interning the
+        # label-side strings makes the equality checks inside the probe
+        # pointer comparisons against the interned index keys.
+        entry_id = self._index.get(
             (
-                entry_filename,
-                entry_dataset,
-                entry_problem,
-                entry_solution,
-                entry_parsed_func,
-                entry_parsed_start,
-                entry_parsed_end,
-            ) = entry_file_parts
-
-            if not entry_filename:
-                # parse_filename failed on the entry's filepath
-                continue
-
-            # 1) Compare problem
-            if entry_problem != label_problem:
-                continue
-            # 2) Compare solution
-            if entry_solution != label_solution:
-                continue
-            # 3) Compare function
-            # We want to see if the label's function == entry_val["function_name"]
-            # or if it matches the parsed function from the scan's filepath.
-            # Typically, we said the JSON has "function_name" that should match label_func.
-            if entry_func_name != label_func:
-                continue
-            # 4) Compare start line
-            # We said "ignore end_line for now," so let's see if entry_start_line
-            # matches label_start. The user wants that check.
-            if entry_start_line != label_start:
-                continue
-
-            if entry_end_line != label_end:
-                continue
-
-            # If all match, we found the correct entry
+                sys.intern(label_problem),
+                sys.intern(label_solution),
+                sys.intern(label_func),
+                label_start,
+                label_end,
+            )
+        )
+        if entry_id is not None:
             return entry_id
 
         # If no match found
         print(f"Cannot find scan results for label file {label_filename}")
         return None
 
+    def find_fun_scan_results_batch(
+        self, label_filepaths: List[str]
+    ) -> List[Optional[str]]:
+        """
+        Resolve many label file paths in one sweep. Each path is parsed once
+        and probed against the index, so N labels cost O(N) instead of N
+        separate calls with their per-call overhead.
+
+        Returns a list aligned with the input: the matching entry ID, or None
+        where a label cannot be parsed or has no matching entry.
+        """
+        _parse = parse_filename
+        _lookup = self._index.get
+        _intern = sys.intern
+
+        results: List[Optional[str]] = []
+        for label_filepath in label_filepaths:
+            (
+                label_filename,
+                _label_dataset,
+                label_problem,
+                label_solution,
+                label_func,
+                label_start,
+                label_end,
+            ) = _parse(label_filepath)
+
+            if not label_filename:
+                # parse_filename failed on label_filepath
+                results.append(None)
+                continue
+
+            results.append(
+                _lookup(
+                    (
+                        _intern(label_problem),
+                        _intern(label_solution),
+                        _intern(label_func),
+                        label_start,
+                        label_end,
+                    )
+                )
+            )
+        return results
+
 
 def condition_range(block_scan_results: Dict) -> Tuple[int, int, int]:
     """
@@ -147,17 +205,21 @@ def condition_range(block_scan_results: Dict) -> Tuple[int, int, int]:
         }
         => returns (125, 125, 147)
     """
-    if "condition_start_line" in block_scan_results:
-        # It's an if- (or similar) statement
+    try:
+        # Single probe doubles as the if-vs-loop dispatch, instead of a
+        # separate `in` membership test followed by the same key lookup.
         cond_line = block_scan_results["condition_start_line"]
-        cond_end = block_scan_results.get("condition_end_line", cond_line)
-        true_end = block_scan_results.get("true_branch_end_line", 0)
-        else_end = block_scan_results.get("else_branch_end_line", 0)
-        # The block extends as far as the max of cond_end, true_end, else_end
-        end_line = max(cond_end, true_end, else_end) if cond_line else cond_line
-        return (cond_line, cond_line, end_line)
-    else:
+    except KeyError:
         # It's a loop statement
         header_line = block_scan_results["header_start_line"]
         loop_statement_end = block_scan_results["loop_statement_end_line"]
         return (header_line, header_line, loop_statement_end)
+
+    # It's an if- (or similar) statement
+    get = block_scan_results.get
+    cond_end = get("condition_end_line", cond_line)
+    true_end = get("true_branch_end_line", 0)
+    else_end = get("else_branch_end_line", 0)
+    # The block extends as far as the max of cond_end, true_end, else_end
+    end_line = max(cond_end, true_end, else_end) if cond_line else cond_line
+    return (cond_line, cond_line, end_line)
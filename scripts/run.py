@@ -1,12 +1,14 @@
-import json
 import os
+import re
 import time
 from typing import Any, Dict, Optional
 
+import orjson
+
 from tqdm import tqdm
 from parse_response import *
-from LLM import *
 import argparse
+import importlib
 import sys
 import traceback
 from multiprocessing import cpu_count, Pool
@@ -15,27 +17,47 @@ from utils import *
 # Constants
 MAX_ITER = 3  # maximum number of retries for a single query if the model returns something invalid or unparseable.
 TIMEOUT_ITER = 100  # maximum number of full retries if something goes really wrong (e.g., API timeout, network error, Bedrock error, etc.).
+WRITE_BATCH_SIZE = 64  # number of encoded result records buffered before they are written out in one writelines call.
+# Pull task_id straight out of the raw bytes when resuming, so we don't pay
+# for a full JSON parse of every already-written record.
+_TID_RE = re.compile(rb'"task_id"\s*:\s*"([^"]+)"')
+
 RETRY_PROMPT = (
     "Your previous response could not be parsed correctly. "
     "Please re-read the prompt and ensure your answer strictly follows the required JSON format enclosed with ```<your response here>```."
     "Ensure that your JSON is valid and matches the specification. Try again:"
 )
 
+# Map model names to (class, attribute) in LLM.py. The LLM module is only
+# imported once a model is actually requested, so just parsing args (or
+# spawning workers) does not pay the provider SDK import cost.
 MODEL_MAP = {
-    "claude3.5": Claude.V3,
-    "claude3.7": Claude.V3_7,
-    "claude3.7-thinking": Claude.V3_7_THINKING,
-    "llama3-405b": LLAMA.V3_405,
-    "ds-r1": DEEPSEEK.R1,
-    "ds-v3": DEEPSEEK.V3,
-    "gpt-4o": OAI.GPT_4O,
-    "o3": OAI.O3,
-    "o4-mini": OAI.O4_MINI,
-    "qwen3": QWEN.V3_235B,
-    "gemini": GEMINI.PRO_2_5,
+    "claude3.5": ("Claude", "V3"),
+    "claude3.7": ("Claude", "V3_7"),
+    "claude3.7-thinking": ("Claude", "V3_7_THINKING"),
+    "llama3-405b": ("LLAMA", "V3_405"),
+    "ds-r1": ("DEEPSEEK", "R1"),
+    "ds-v3": ("DEEPSEEK", "V3"),
+    "gpt-4o": ("OAI", "GPT_4O"),
+    "o3": ("OAI", "O3"),
+    "o4-mini": ("OAI", "O4_MINI"),
+    "qwen3": ("QWEN", "V3_235B"),
+    "gemini": ("GEMINI", "PRO_2_5"),
 }
 
 
+def make_llm(model: str, max_tokens: int, temperature: float):
+    """Lazily import LLM.py and construct the client for the given model name."""
+    llm_module = importlib.import_module("LLM")
+    class_name, attr_name = MODEL_MAP[model]
+    model_id = getattr(getattr(llm_module, class_name), attr_name)
+    return llm_module.LLM(
+        model_id=model_id,
+        max_token_to_sample=max_tokens,
+        temperature=temperature,
+    )
+
+
 def run_inference(
     prompt_file: str,
     response_folder: str,
@@ -45,20 +67,23 @@ def run_inference(
     lite: Optional[str] = None,
     trace: bool = False,
     source: bool = False,
+    llm=None,
 ) -> None:
     os.makedirs(response_folder, exist_ok=True)
 
+    lite_sets = None
     if lite:
         lite_metadata = read_json(lite)
+        # Convert the leaf task-id lists to frozensets once, so the per-task
+        # filter below is a single hash probe instead of two dict indexes
+        # plus a linear list scan.
+        lite_sets = {
+            tt: {lang: frozenset(ids) for lang, ids in langs.items()}
+            for tt, langs in lite_metadata.items()
+        }
 
-    llm = LLM(
-        model_id=MODEL_MAP[model],
-        max_token_to_sample=max_tokens,
-        temperature=temperature,
-    )
-
-    with open(prompt_file, "r") as f:
-        lines = f.readlines()
+    if llm is None:
+        llm = make_llm(model, max_tokens, temperature)
 
     base_filename = (
         os.path.splitext(os.path.basename(prompt_file))[0] + "_response.jsonl"
@@ -68,89 +93,137 @@ def run_inference(
     # Read previously processed task_ids
     processed_task_ids = set()
     if os.path.exists(output_path):
-        with open(output_path, "r", encoding="utf-8") as outf:
+        with open(output_path, "rb") as outf:
             for line in outf:
+                m = _TID_RE.search(line)
+                if m:
+                    processed_task_ids.add(m.group(1).decode())
+                    continue
+                # Fall back to a full parse for lines the regex misses
+                # (e.g. escaped quotes inside the task_id).
                 try:
-                    record = json.loads(line)
+                    record = orjson.loads(line)
                     task_id = record.get("task_id")
                     if task_id:
                         processed_task_ids.add(task_id)
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     continue  # Optionally log bad lines
 
-    with open(output_path, "a") as out_f:
-        for idx in tqdm(range(len(lines)), desc="Processing prompts"):
-            data = json.loads(lines[idx])
-            if source and data["category"] != "source":
-                continue
-            if trace and data["category"] != "trace":
-                continue
-            task_id = data.get("task_id")
-            task_type = task_id.split("_")[0]
-            language = data["language"]
-            if task_id in processed_task_ids:
-                continue
-            if lite and task_id not in lite_metadata[task_type][language]:
-                continue
-
-            prompt_text = data.get("prompt", "")
-            task_id = data["task_id"]
-
-            if not prompt_text:
-                continue
-
-            messages = [{"role": "user", "content": prompt_text}]
-            responses = []
-            parsed_result = None
-            input_len, output_len = -1, -1
-            total_time = -1
-            success = False
-
-            for timeout_attempt in range(TIMEOUT_ITER):
-                try:
-                    start_time = time.time()
-                    for _ in range(MAX_ITER):
-                        response, in_len, out_len = llm.predict(messages)
-                        responses.append(response)
-                        parsed_result = parse_dependence_output(
-                            response, task_type, trace=trace
-                        )
-                        if parsed_result is not None:
-                            input_len, output_len = in_len, out_len
-                            break
-                        else:
-                            messages.append({"role": "assistant", "content": response})
-                            messages.append({"role": "user", "content": RETRY_PROMPT})
-
-                    total_time = time.time() - start_time
-                    success = True
-                    break
-                except Exception as e:
-                    print(f"[Error] model failed on {prompt_file} line {idx}: {e}")
-                    traceback.print_exc()
-                    time.sleep(5)  # optional delay between retries
-
-            if not success:
-                print(
-                    f"[FATAL] Model consistently failed for {prompt_file} at task {task_id}. Please investigate."
-                )
-                break  # pause entire prompt_file
-
-            result_data = dict(data)  # start from original
-            result_data["response"] = {
-                "original": responses,
-                "parsed": parsed_result,
-                "input_len": input_len,
-                "output_len": output_len,
-                "num_iter": len(responses),
-                "time": total_time,
-            }
-            json.dump(result_data, out_f)
-            out_f.write("\n")
+    with open(prompt_file, "r") as f, open(
+        output_path, "ab", buffering=1 << 20
+    ) as out_f:
+        # Buffer encoded records and write them in batches so each completed
+        # task costs a list append instead of a write syscall. The finally
+        # block flushes anything still pending on normal exit, break, or an
+        # exception escaping the loop, so completed responses are never lost.
+        batch = []
+        try:
+            for idx, line in enumerate(tqdm(f, desc="Processing prompts")):
+                # Cheap substring pre-filter: a line whose category is "source"
+                # must contain the literal '"source"', so lines without it can
+                # be skipped before paying for a full JSON parse.
+                if source and '"source"' not in line:
+                    continue
+                if trace and '"trace"' not in line:
+                    continue
+                data = orjson.loads(line)
+                if source and data["category"] != "source":
+                    continue
+                if trace and data["category"] != "trace":
+                    continue
+                task_id = data.get("task_id")
+                # partition stops at the first "_" instead of splitting out
+                # every component just to keep the first one
+                task_type = task_id.partition("_")[0]
+                language = data["language"]
+                if task_id in processed_task_ids:
+                    continue
+                if lite_sets is not None:
+                    allowed = lite_sets.get(task_type, {}).get(language)
+                    if allowed is not None and task_id not in allowed:
+                        continue
+
+                prompt_text = data.get("prompt", "")
+
+                if not prompt_text:
+                    continue
+
+                messages = [{"role": "user", "content": prompt_text}]
+                responses = []
+                parsed_result = None
+                input_len, output_len = -1, -1
+                total_time = -1
+                success = False
+
+                for timeout_attempt in range(TIMEOUT_ITER):
+                    try:
+                        start_time = time.time()
+                        for _ in range(MAX_ITER):
+                            response, in_len, out_len = llm.predict(messages)
+                            responses.append(response)
+                            # Cheap pre-shape check: the required JSON payload
+                            # always contains a brace, so a response without one
+                            # cannot parse -- skip the parse attempt and go
+                            # straight to the retry prompt.
+                            if "{" in response or "[" in response:
+                                parsed_result = parse_dependence_output(
+                                    response, task_type, trace=trace
+                                )
+                            else:
+                                parsed_result = None
+                            if parsed_result is not None:
+                                input_len, output_len = in_len, out_len
+                                break
+                            else:
+                                messages.append({"role": "assistant", "content": response})
+                                messages.append({"role": "user", "content": RETRY_PROMPT})
+
+                        total_time = time.time() - start_time
+                        success = True
+                        break
+                    except Exception as e:
+                        print(f"[Error] model failed on {prompt_file} line {idx}: {e}")
+                        traceback.print_exc()
+                        time.sleep(5)  # optional delay between retries
+
+                if not success:
+                    print(
+                        f"[FATAL] Model consistently failed for {prompt_file} at task {task_id}. Please investigate."
+                    )
+                    break  # pause entire prompt_file
+
+                result_data = dict(data)  # start from original
+                result_data["response"] = {
+                    "original": responses,
+                    "parsed": parsed_result,
+                    "input_len": input_len,
+                    "output_len": output_len,
+                    "num_iter": len(responses),
+                    "time": total_time,
+                }
+                batch.append(orjson.dumps(result_data) + b"\n")
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    out_f.writelines(batch)
+                    out_f.flush()
+                    batch.clear()
+
+        finally:
+            if batch:
+                out_f.writelines(batch)
+
+
+# Per-worker LLM client, built once in the Pool initializer so each worker
+# pays the SDK handshake a single time instead of once per prompt file.
+_WORKER_LLM = None
+
+
+def _init_worker(model, max_tokens, temperature):
+    global _WORKER_LLM
+    _WORKER_LLM = make_llm(model, max_tokens, temperature)
 
 
 def _parallel_worker(args):
-    run_inference(*args)
+    run_inference(*args, llm=_WORKER_LLM)
 
 
 def run_inference_on_folder(
@@ -165,26 +238,33 @@ def run_inference_on_folder(
     num_workers=10,
 ) -> None:
     tasks = []
-    for filename in os.listdir(prompt_folder):
-        if filename.endswith(".jsonl"):
-            prompt_file_path = os.path.join(prompt_folder, filename)
-            tasks.append(
-                (
-                    prompt_file_path,
-                    response_folder,
-                    model,
-                    max_tokens,
-                    temperature,
-                    lite,
-                    trace,
-                    source,
+    # scandir yields DirEntry objects with the path and cached file type,
+    # avoiding the per-name join + stat that listdir would cost.
+    with os.scandir(prompt_folder) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".jsonl"):
+                tasks.append(
+                    (
+                        entry.path,
+                        response_folder,
+                        model,
+                        max_tokens,
+                        temperature,
+                        lite,
+                        trace,
+                        source,
+                    )
                 )
-            )
 
-    with Pool(processes=num_workers) as pool:
+    with Pool(
+        processes=num_workers,
+        initializer=_init_worker,
+        initargs=(model, max_tokens, temperature),
+    ) as pool:
+        chunksize = max(1, len(tasks) // (num_workers * 4))
         list(
             tqdm(
-                pool.imap_unordered(_parallel_worker, tasks),
+                pool.imap_unordered(_parallel_worker, tasks, chunksize=chunksize),
                 total=len(tasks),
                 desc="Batch Processing",
             )
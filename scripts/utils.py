@@ -1,3 +1,4 @@
+import functools
 import json
 import os
 from typing import Any, List, Tuple
@@ -81,6 +82,7 @@ class LabelError(Exception):
         self.msg = message
 
 
+@functools.lru_cache(maxsize=None)
 def parse_filename(file_path: str) -> Tuple[str, str, str, str, str, int, int]:
     # example input: 'gcj_524_7220_run_horses_5_33.yaml'
     # example output: ('gcj_524_7220_run_horses_5_33', 'gcj', '524', '7220', 'run_horses', 5, 33)